@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Persistent Embedding Cache for OpenAI embeddings
+Vectors are stored in SQLite keyed by SHA-256 of the embedding model,
+dimension and text, so unchanged chunks and repeated queries are never sent
+to OpenAI twice.
+Recently used vectors are also kept in memory in front of SQLite.
+"""
+
+import os
+import asyncio
+import functools
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "rag-pdf", "embedding_cache.sqlite")
+# Vectors kept in memory (LRU); at 1536 float32 dimensions this is ~25 MB
+MEMORY_CACHE_SIZE = int(os.getenv("EMBEDDING_MEMORY_CACHE_SIZE", "4096"))
+
+class EmbeddingCache:
+    """SQLite-backed map from text hash to float32 embedding, with an in-memory LRU tier"""
+
+    def __init__(self, path: str = CACHE_PATH, memory_size: int = MEMORY_CACHE_SIZE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Separate locks so memory hits never wait on a SQLite commit
+        self._memory_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_size = memory_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_memory(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return vectors for whichever keys are in the memory tier"""
+        found = {}
+        with self._memory_lock:
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vec
+        return found
+
+    def get_stored(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return vectors for whichever keys are in SQLite, promoting them to memory"""
+        found = {}
+        with self._db_lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        self.remember_many(found)
+        return found
+
+    def remember_many(self, items: Dict[str, np.ndarray]):
+        """Add vectors to the memory tier, evicting the least recently used"""
+        with self._memory_lock:
+            for key, vec in items.items():
+                self._memory[key] = vec
+                self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_size:
+                self._memory.popitem(last=False)
+
+    def store_many(self, items: Dict[str, np.ndarray]):
+        """Write vectors to SQLite, replacing any existing entry for the same key"""
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+                [(key, vec.tobytes()) for key, vec in items.items()]
+            )
+            self._conn.commit()
+
+def text_hash(text: str, model: str, embedding_dim: int) -> str:
+    """Cache key for text embedded by model at embedding_dim dimensions"""
+    return hashlib.sha256(f"{model}\0{embedding_dim}\0{text}".encode("utf-8")).hexdigest()
+
+def make_cached_embed(
+    embed_func: Callable[..., Awaitable[np.ndarray]],
+    cache: EmbeddingCache,
+    model: str,
+    embedding_dim: int
+) -> Callable[..., Awaitable[np.ndarray]]:
+    """
+    Wrap an async embedding function so only cache misses reach it
+
+    model and embedding_dim must describe what embed_func returns; they are
+    part of every cache key, so switching either never serves stale vectors.
+    Memory hits are answered inline, SQLite reads and writes run in a thread.
+    """
+
+    async def cached_embed(texts: List[str], **kwargs) -> np.ndarray:
+        keys = [text_hash(text, model, embedding_dim) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        found = cache.get_memory(unique)
+        misses = [key for key in unique if key not in found]
+        if misses:
+            try:
+                found.update(await asyncio.to_thread(cache.get_stored, misses))
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache read failed: {e}")
+
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        if missing:
+            texts_by_key = dict(zip(keys, texts))
+            vectors = await embed_func([texts_by_key[key] for key in missing], **kwargs)
+            fresh = {key: np.asarray(vec, dtype=np.float32) for key, vec in zip(missing, vectors)}
+            cache.remember_many(fresh)
+            try:
+                await asyncio.to_thread(cache.store_many, fresh)
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+            found.update(fresh)
+
+        return np.stack([found[key] for key in keys])
+
+    return cached_embed
+
+_default_cache = None
+_cached_openai_embed = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache stored under rag-pdf/"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache()
+    return _default_cache
+
+async def cached_openai_embed(texts: List[str], **kwargs) -> np.ndarray:
+    """openai_embed with the persistent cache in front of it"""
+    global _cached_openai_embed
+    if _cached_openai_embed is None:
+        from lightrag.llm.openai import openai_embed
+        from openai_http import openai_client_configs
+        _cached_openai_embed = make_cached_embed(
+            functools.partial(openai_embed, client_configs=openai_client_configs()),
+            get_embedding_cache(),
+            openai_embed.model_name,
+            openai_embed.embedding_dim
+        )
+    return await _cached_openai_embed(texts, **kwargs)
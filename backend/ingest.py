@@ -1,16 +1,28 @@
 import os
+import re
+import sys
 import asyncio
-import pdfplumber
 import dotenv
 import logging
 import shutil
-import json
+import stat
+import tempfile
+import hashlib
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import repeat
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, TYPE_CHECKING
 
-from lightrag import LightRAG
-from lightrag.llm.openai import gpt_4o_mini_complete, openai_embed
-from lightrag.kg.shared_storage import initialize_pipeline_status
+import orjson
+
+# PDF parsers, numpy and LightRAG (openai SDK, tiktoken, ...) are imported
+# where they are used so that importing this module stays cheap
+if TYPE_CHECKING:
+    import numpy as np
 
 # -------------------------
 # 🔧 Logging
@@ -36,18 +48,128 @@ if not OPENAI_KEY:
 BACKEND_DIR = os.path.dirname(__file__)
 PDF_DIR = os.path.join(BACKEND_DIR, "rag-pdf")
 WORKING_DIR = PDF_DIR  # NanoDB will be stored here
+METADATA_FILE = os.path.join(WORKING_DIR, "ingestion_metadata.json")
 
 # -------------------------
 # 📄 PDF Text Extraction with Metadata
 # -------------------------
-def extract_text_from_pdf(pdf_path: str) -> tuple[str, Dict[str, Any]]:
-    """Extract text and metadata from PDF"""
+# Per-page progress is logged at INFO only every PAGE_LOG_INTERVAL pages
+PAGE_LOG_INTERVAL = 50
+
+WORD_RE = re.compile(r"\S+")
+
+# Pages per extraction worker process, at least; PDFs too short to give two
+# workers this many pages are extracted in-process
+PARALLEL_EXTRACT_MIN_PAGES = 20
+EXTRACT_WORKERS = os.cpu_count() or 1
+
+# One pool shared by every PDF, so concurrent extractions never run more
+# than EXTRACT_WORKERS processes between them. Workers are spawned rather
+# than forked: ingestion can run inside the threaded API server, and a
+# forked child could inherit locks held by other threads. The pool only
+# lives while an ingestion run is in progress (see _extract_pool_session).
+_extract_pool = None
+_extract_pool_users = 0
+_extract_pool_lock = threading.Lock()
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _extract_pool
+
+@contextmanager
+def _extract_pool_session():
+    """Keep the extraction pool for an ingestion run; the last run to finish shuts it down"""
+    global _extract_pool, _extract_pool_users
+    with _extract_pool_lock:
+        _extract_pool_users += 1
+    try:
+        yield
+    finally:
+        with _extract_pool_lock:
+            _extract_pool_users -= 1
+            pool = _extract_pool if _extract_pool_users == 0 else None
+            if pool is not None:
+                _extract_pool = None
+        # Every extraction has finished, so the workers are idle and exit at once
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+def _pdfium_page_text(pdf, index: int) -> str:
+    page = pdf[index]
+    textpage = page.get_textpage()
+    try:
+        # PDFium separates lines with CRLF; normalise to match pdfplumber
+        return textpage.get_text_range().replace("\r\n", "\n")
+    finally:
+        textpage.close()
+        page.close()
+
+def _extract_page_range_pdfium(pdf_path: str, start: int, stop: int) -> list[str]:
+    """Worker: extract pages [start, stop) from its own handle on the PDF"""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        return [_pdfium_page_text(pdf, i) for i in range(start, stop)]
+    finally:
+        pdf.close()
+
+def _extract_pages_pdfium(pdf_path: str) -> list[str]:
+    """Extract per-page text with pypdfium2 (native PDFium, much faster than pdfplumber)"""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        total_pages = len(pdf)
+        workers = min(EXTRACT_WORKERS, total_pages // PARALLEL_EXTRACT_MIN_PAGES)
+        # A single worker would only reopen the PDF to do the same serial work
+        if workers < 2:
+            return [_pdfium_page_text(pdf, i) for i in range(total_pages)]
+    finally:
+        pdf.close()
+
+    # Large document: give each worker a contiguous page range so the
+    # per-process open cost is paid once per range, not once per page
+    step = -(-total_pages // workers)
+    starts = range(0, total_pages, step)
+    ranges = _get_extract_pool().map(
+        _extract_page_range_pdfium,
+        repeat(pdf_path),
+        starts,
+        (min(start + step, total_pages) for start in starts)
+    )
+    return [page_text for page_range in ranges for page_text in page_range]
+
+def _extract_pages_pdfplumber(pdf_path: str) -> list[str]:
+    """Extract per-page text with pdfplumber's layout analysis"""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages]
+
+@dataclass(slots=True)
+class PageInfo:
+    """Per-page extraction stats; one is kept for every page of every document"""
+    page_number: int
+    text_length: int
+    has_text: bool
+
+def extract_pages_from_pdf(pdf_path: str) -> tuple[list[str], Dict[str, Any]]:
+    """Extract one formatted text block per non-empty page, plus PDF metadata"""
     logger.info(f"Extracting text from PDF: {pdf_path}")
-    text = ""
+    page_blocks: list[str] = []
+    st = os.stat(pdf_path)
     metadata = {
         "source_file": os.path.basename(pdf_path),
         "file_path": pdf_path,
-        "file_size": os.path.getsize(pdf_path),
+        "file_size": st.st_size,
+        "mtime": st.st_mtime,
         "ingestion_date": datetime.now().isoformat(),
         "document_type": "PDF",
         "total_pages": 0,
@@ -55,44 +177,76 @@ def extract_text_from_pdf(pdf_path: str) -> tuple[str, Dict[str, Any]]:
     }
     
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            metadata["total_pages"] = len(pdf.pages)
-            
-            for page_num, page in enumerate(pdf.pages, 1):
-                page_text = page.extract_text()
-                if page_text:
-                    text += f"\n--- Page {page_num} ---\n{page_text}\n"
-                    
-                    # Store page metadata
-                    page_metadata = {
-                        "page_number": page_num,
-                        "text_length": len(page_text),
-                        "has_text": bool(page_text.strip())
-                    }
-                    metadata["page_info"].append(page_metadata)
-                    
-                logger.info(f"Processed page {page_num} of {pdf_path}")
+        try:
+            pages = _extract_pages_pdfium(pdf_path)
+        except Exception as e:
+            # Fallback: pdfplumber copes with some PDFs PDFium can't read
+            logger.warning(f"pypdfium2 failed on {pdf_path}, falling back to pdfplumber: {e}")
+            pages = _extract_pages_pdfplumber(pdf_path)
+
+        metadata["total_pages"] = len(pages)
+        
+        for page_num, page_text in enumerate(pages, 1):
+            if page_text:
+                page_blocks.append(f"\n--- Page {page_num} ---\n{page_text}\n")
+                
+                # Store page metadata
+                metadata["page_info"].append(
+                    PageInfo(page_num, len(page_text), not page_text.isspace())
+                )
+                
+            if page_num % PAGE_LOG_INTERVAL == 0:
+                logger.info(f"Processed {page_num}/{metadata['total_pages']} pages of {pdf_path}")
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Processed page {page_num} of {pdf_path}")
                 
     except Exception as e:
         logger.error(f"Error reading {pdf_path}: {e}")
         metadata["error"] = str(e)
         
-    return text.strip(), metadata
+    return page_blocks, metadata
+
+def extract_text_from_pdf(pdf_path: str) -> tuple[str, Dict[str, Any]]:
+    """Extract text and metadata from PDF"""
+    page_blocks, metadata = extract_pages_from_pdf(pdf_path)
+    return "".join(page_blocks).strip(), metadata
+
+def count_words(text: str) -> int:
+    """Count whitespace-separated words without materialising them as a list"""
+    return sum(1 for _ in WORD_RE.finditer(text))
 
 def generate_document_description(filename: str, text: str, metadata: Dict[str, Any]) -> str:
     """Generate a description of the document based on its content and metadata"""
     # Extract first few sentences for description
-    sentences = text.split('.')[:3]
+    sentences = text.split('.', 3)[:3]
     preview = '. '.join(sentences).strip()
     
     # Create document description
-    description = f"Document: {filename}\n"
-    description += f"Type: MSME Loan Policy Document\n"
-    description += f"Pages: {metadata.get('total_pages', 0)}\n"
-    description += f"Content Preview: {preview[:200]}..."
+    description = "\n".join((
+        f"Document: {filename}",
+        "Type: MSME Loan Policy Document",
+        f"Pages: {metadata.get('total_pages', 0)}",
+        f"Content Preview: {preview[:200]}..."
+    ))
     
     return description
 
+# Metadata fields that are identical for every document; shared rather than
+# rebuilt per document
+DOCUMENT_TYPE = "MSME_POLICY_DOCUMENT"
+DOCUMENT_CATEGORY = "LOAN_POLICY"
+BUSINESS_DOMAIN = "MSME_LOANS"
+DOCUMENT_PURPOSE = "POLICY_REFERENCE"
+TARGET_AUDIENCE = "LOAN_OFFICERS_MSME_APPLICANTS"
+SEARCH_KEYWORDS = (
+    "MSME", "loan", "policy", "eligibility", "requirements",
+    "application", "approval", "documentation", "process"
+)
+CONTENT_TOPICS = (
+    "loan_eligibility", "application_process", "documentation_requirements",
+    "approval_criteria", "policy_guidelines"
+)
+
 def create_document_metadata(filename: str, text: str, pdf_metadata: Dict[str, Any]) -> Dict[str, Any]:
     """Create comprehensive metadata for the document"""
     # Generate document description
@@ -103,14 +257,16 @@ def create_document_metadata(filename: str, text: str, pdf_metadata: Dict[str, A
         # Document identification
         "document_id": filename.replace('.pdf', '').replace(' ', '_').lower(),
         "document_name": filename,
-        "document_type": "MSME_POLICY_DOCUMENT",
-        "document_category": "LOAN_POLICY",
+        # Lowercased once here so retrieval-time matching doesn't redo it per query
+        "document_name_lower": filename.lower(),
+        "document_type": DOCUMENT_TYPE,
+        "document_category": DOCUMENT_CATEGORY,
         
         # Content information
         "description": description,
         "content_summary": text[:500] + "..." if len(text) > 500 else text,
         "total_characters": len(text),
-        "total_words": len(text.split()),
+        "total_words": count_words(text),
         
         # File information
         "source_file": pdf_metadata["source_file"],
@@ -125,22 +281,16 @@ def create_document_metadata(filename: str, text: str, pdf_metadata: Dict[str, A
         
         # Content structure
         "page_info": pdf_metadata["page_info"],
-        "has_content": bool(text.strip()),
+        "has_content": bool(text) and not text.isspace(),
         
         # Business context
-        "business_domain": "MSME_LOANS",
-        "document_purpose": "POLICY_REFERENCE",
-        "target_audience": "LOAN_OFFICERS_MSME_APPLICANTS",
+        "business_domain": BUSINESS_DOMAIN,
+        "document_purpose": DOCUMENT_PURPOSE,
+        "target_audience": TARGET_AUDIENCE,
         
         # Search and retrieval hints
-        "search_keywords": [
-            "MSME", "loan", "policy", "eligibility", "requirements",
-            "application", "approval", "documentation", "process"
-        ],
-        "content_topics": [
-            "loan_eligibility", "application_process", "documentation_requirements",
-            "approval_criteria", "policy_guidelines"
-        ]
+        "search_keywords": SEARCH_KEYWORDS,
+        "content_topics": CONTENT_TOPICS
     }
     
     # Add error information if any
@@ -149,9 +299,63 @@ def create_document_metadata(filename: str, text: str, pdf_metadata: Dict[str, A
     
     return metadata
 
+# -------------------------
+# ♻️ Re-ingestion Cache
+# -------------------------
+def compute_file_hash(pdf_path: str) -> str:
+    """SHA-256 of the raw PDF bytes, used to detect unchanged files"""
+    with open(pdf_path, 'rb') as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+def load_prior_ingestion() -> Dict[str, Dict[str, Any]]:
+    """Map filename -> summary entry for PDFs successfully ingested in a previous run"""
+    try:
+        with open(METADATA_FILE, 'rb') as f:
+            raw = f.read()
+        prior_summary = orjson.loads(raw)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Failed to load previous metadata summary: {e}")
+        return {}
+
+    return {
+        doc_info["filename"]: doc_info
+        for doc_info in prior_summary.get("ingestion_session", {}).get("documents_processed", [])
+        if doc_info.get("status") == "success" and doc_info.get("metadata", {}).get("content_hash")
+    }
+
+def _write_file_atomic(path: str, data: bytes):
+    """Replace path with data so readers see either the old or the new file, never a partial one"""
+    # mkstemp creates the file 0600; keep the mode of the file being replaced
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        # The file object owns fd from here, so any error below closes it
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
 # -------------------------
 # 📁 Setup PDF Directory
 # -------------------------
+def _link_or_copy(source_path: str, dest_path: str):
+    """Hard-link source to dest (no data copied), copying when linking isn't possible"""
+    try:
+        os.link(source_path, dest_path)
+    except OSError:
+        # Cross-device, unsupported filesystem, or no permission
+        shutil.copy2(source_path, dest_path)
+
 def setup_pdf_directory():
     """Create rag-pdf directory and copy PDFs from backend folder"""
     os.makedirs(PDF_DIR, exist_ok=True)
@@ -163,21 +367,90 @@ def setup_pdf_directory():
         source_path = os.path.join(BACKEND_DIR, pdf_file)
         dest_path = os.path.join(PDF_DIR, pdf_file)
         
-        if not os.path.exists(dest_path):
-            shutil.copy2(source_path, dest_path)
+        # One stat per side answers both "exists?" and "is it stale?"
+        try:
+            dest_mtime = os.stat(dest_path).st_mtime
+        except FileNotFoundError:
+            dest_mtime = None
+
+        if dest_mtime is None:
+            _link_or_copy(source_path, dest_path)
             logger.info(f"✅ Copied {pdf_file} to rag-pdf directory")
+        elif os.stat(source_path).st_mtime > dest_mtime:
+            os.unlink(dest_path)
+            _link_or_copy(source_path, dest_path)
+            logger.info(f"🔄 Updated {pdf_file} in rag-pdf directory")
         else:
             logger.info(f"📁 {pdf_file} already exists in rag-pdf directory")
 
 # -------------------------
 # ⚙️ Initialize LightRAG
 # -------------------------
+# Documents are independent, so several can be extracted and inserted at once.
+# Inserts are bound by OpenAI round-trips, not local CPU.
+MAX_PARALLEL_INSERT = int(os.getenv("MAX_PARALLEL_INSERT", "4"))
+LLM_MODEL_MAX_ASYNC = int(os.getenv("LLM_MODEL_MAX_ASYNC", "16"))
+
+# Bulk ingest hands LightRAG's embedder large batches; batched_openai_embed
+# splits them into requests that stay under OpenAI's per-request limits
+# (2048 inputs / 300k tokens; chunks are at most ~1200 tokens each)
+EMBEDDING_BATCH_NUM = 2048
+EMBEDDING_REQUEST_SIZE = 128
+EMBEDDING_FUNC_MAX_ASYNC = 16
+_embedding_request_semaphore = asyncio.Semaphore(EMBEDDING_FUNC_MAX_ASYNC)
+
+async def _embed_request(texts: list[str]) -> "np.ndarray":
+    from lightrag.llm.openai import openai_embed
+    from openai_http import openai_client_configs
+
+    async with _embedding_request_semaphore:
+        return await openai_embed(texts, client_configs=openai_client_configs())
+
+async def batched_openai_embed(texts: list[str]) -> "np.ndarray":
+    """Embed texts as concurrent OpenAI requests of EMBEDDING_REQUEST_SIZE each"""
+    import numpy as np
+
+    if len(texts) <= EMBEDDING_REQUEST_SIZE:
+        return await _embed_request(texts)
+
+    parts = await asyncio.gather(*(
+        _embed_request(texts[i:i + EMBEDDING_REQUEST_SIZE])
+        for i in range(0, len(texts), EMBEDDING_REQUEST_SIZE)
+    ))
+    return np.concatenate(parts)
+
 async def initialize_rag():
+    # Inside the API server rag_store is already imported; share its LightRAG
+    # instance rather than loading the same storages a second time
+    rag_store = sys.modules.get("rag_store")
+    if rag_store is not None:
+        logger.info("Reusing the API server's LightRAG instance")
+        return await rag_store.get_rag()
+
+    from lightrag import LightRAG
+    from lightrag.llm.openai import gpt_4o_mini_complete, openai_embed
+    from lightrag.utils import EmbeddingFunc
+    from lightrag.kg.shared_storage import initialize_pipeline_status
+    from cached_embed import get_embedding_cache, make_cached_embed
+    from openai_http import openai_client_configs
+
     logger.info("Initializing LightRAG with OpenAI embedding + GPT-4o-mini...")
     rag = LightRAG(
         working_dir=WORKING_DIR,
-        embedding_func=openai_embed,
-        llm_model_func=gpt_4o_mini_complete
+        embedding_func=EmbeddingFunc(
+            embedding_dim=openai_embed.embedding_dim,
+            max_token_size=openai_embed.max_token_size,
+            func=make_cached_embed(
+                batched_openai_embed, get_embedding_cache(),
+                openai_embed.model_name, openai_embed.embedding_dim
+            )
+        ),
+        llm_model_func=gpt_4o_mini_complete,
+        llm_model_kwargs={"openai_client_configs": openai_client_configs()},
+        max_parallel_insert=MAX_PARALLEL_INSERT,
+        llm_model_max_async=LLM_MODEL_MAX_ASYNC,
+        embedding_batch_num=EMBEDDING_BATCH_NUM,
+        embedding_func_max_async=EMBEDDING_FUNC_MAX_ASYNC
     )
     await rag.initialize_storages()
     await initialize_pipeline_status()
@@ -186,7 +459,90 @@ async def initialize_rag():
 # -------------------------
 # 🚀 Ingest all PDFs with Metadata
 # -------------------------
-def main():
+# Documents with more pages than this are inserted in page windows
+INSERT_PAGE_BATCH = int(os.getenv("INSERT_PAGE_BATCH", "100"))
+
+async def insert_text(rag, text: str, document_metadata: Dict[str, Any], pdf: str) -> bool:
+    """Insert text into LightRAG, returning whether metadata was accepted"""
+    # Note: LightRAG's insert method should accept metadata as a parameter
+    # If it doesn't, we'll need to modify the approach
+    try:
+        # Try to insert with metadata
+        await rag.ainsert(text, metadata=document_metadata)
+        return True
+    except TypeError:
+        # Fallback: insert without metadata if not supported, but keep the
+        # source file so every chunk can still be traced back to its PDF
+        await rag.ainsert(text, file_paths=pdf)
+        return False
+
+async def process_pdf(
+    rag,
+    pdf: str,
+    semaphore: asyncio.Semaphore,
+    prior: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Extract a single PDF and insert it into LightRAG, returning its summary entry"""
+    pdf_path = os.path.join(PDF_DIR, pdf)
+    logger.info(f"\n📖 Processing: {pdf}")
+
+    # Skip extraction and embedding entirely when the file is byte-identical
+    # to the one ingested last time
+    content_hash = await asyncio.to_thread(compute_file_hash, pdf_path)
+    prior_entry = prior.get(pdf)
+    if prior_entry and prior_entry["metadata"]["content_hash"] == content_hash:
+        logger.info(f"⏭️ Skipping {pdf} (unchanged since last ingestion)")
+        return prior_entry
+
+    # Extract text and basic metadata off the event loop so parsing overlaps
+    # with inserts that are already waiting on the API
+    page_blocks, pdf_metadata = await asyncio.to_thread(extract_pages_from_pdf, pdf_path)
+    text = "".join(page_blocks).strip()
+
+    if not text:
+        logger.warning(f"⚠️ No text extracted from: {pdf}")
+        return {
+            "filename": pdf,
+            "status": "failed",
+            "error": "No text extracted"
+        }
+
+    # Create comprehensive metadata
+    document_metadata = create_document_metadata(pdf, text, pdf_metadata)
+    document_metadata["content_hash"] = content_hash
+    text_length = len(text)
+
+    if len(page_blocks) > INSERT_PAGE_BATCH:
+        # Large document: stream page windows into LightRAG so neither the full
+        # text nor LightRAG's chunk list for the whole document is held at once
+        del text
+        windows = (
+            "".join(page_blocks[i:i + INSERT_PAGE_BATCH]).strip()
+            for i in range(0, len(page_blocks), INSERT_PAGE_BATCH)
+        )
+    else:
+        windows = (text,)
+
+    async with semaphore:
+        for window in windows:
+            with_metadata = await insert_text(rag, window, document_metadata, pdf)
+
+    if with_metadata:
+        logger.info(f"✅ Successfully ingested: {pdf} with metadata")
+    else:
+        logger.warning(f"⚠️ Ingested {pdf} without metadata (LightRAG version may not support metadata)")
+
+    logger.info(f"   Text length: {text_length} characters")
+    logger.info(f"   Pages: {document_metadata['total_pages']}")
+    logger.info(f"   Description: {document_metadata['description'][:100]}...")
+
+    return {
+        "filename": pdf,
+        "status": "success",
+        "metadata": document_metadata
+    }
+
+async def main_async():
     logger.info("🚀 Starting PDF ingestion process with metadata...")
     
     # Setup PDF directory and copy files
@@ -206,7 +562,7 @@ def main():
         logger.info(f"  - {pdf}")
 
     # Initialize LightRAG
-    rag = asyncio.run(initialize_rag())
+    rag = await initialize_rag()
 
     # Store metadata summary
     metadata_summary = {
@@ -217,64 +573,33 @@ def main():
         }
     }
 
-    # Process each PDF
-    for pdf in pdf_files:
-        pdf_path = os.path.join(PDF_DIR, pdf)
-        logger.info(f"\n📖 Processing: {pdf}")
-        
-        # Extract text and basic metadata
-        text, pdf_metadata = extract_text_from_pdf(pdf_path)
-        
-        if text:
-            # Create comprehensive metadata
-            document_metadata = create_document_metadata(pdf, text, pdf_metadata)
-            
-            # Insert into LightRAG with metadata
-            # Note: LightRAG's insert method should accept metadata as a parameter
-            # If it doesn't, we'll need to modify the approach
-            try:
-                # Try to insert with metadata
-                rag.insert(text, metadata=document_metadata)
-                logger.info(f"✅ Successfully ingested: {pdf} with metadata")
-            except TypeError:
-                # Fallback: insert without metadata if not supported
-                rag.insert(text)
-                logger.warning(f"⚠️ Ingested {pdf} without metadata (LightRAG version may not support metadata)")
-            
-            logger.info(f"   Text length: {len(text)} characters")
-            logger.info(f"   Pages: {document_metadata['total_pages']}")
-            logger.info(f"   Description: {document_metadata['description'][:100]}...")
-            
-            # Store in summary
-            metadata_summary["ingestion_session"]["documents_processed"].append({
-                "filename": pdf,
-                "status": "success",
-                "metadata": document_metadata
-            })
-            
-        else:
-            logger.warning(f"⚠️ No text extracted from: {pdf}")
-            metadata_summary["ingestion_session"]["documents_processed"].append({
-                "filename": pdf,
-                "status": "failed",
-                "error": "No text extracted"
-            })
+    # Process all PDFs concurrently, bounded by MAX_PARALLEL_INSERT
+    prior = load_prior_ingestion()
+    semaphore = asyncio.Semaphore(MAX_PARALLEL_INSERT)
+    with _extract_pool_session():
+        documents_processed = await asyncio.gather(
+            *(process_pdf(rag, pdf, semaphore, prior) for pdf in pdf_files)
+        )
+    metadata_summary["ingestion_session"]["documents_processed"].extend(documents_processed)
 
     # Save metadata summary
     metadata_summary["ingestion_session"]["end_time"] = datetime.now().isoformat()
-    metadata_file = os.path.join(WORKING_DIR, "ingestion_metadata.json")
     
     try:
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata_summary, f, indent=2, ensure_ascii=False)
-        logger.info(f"💾 Metadata summary saved to: {metadata_file}")
+        # PageInfo entries are dataclasses, which orjson encodes natively
+        data = orjson.dumps(metadata_summary, option=orjson.OPT_INDENT_2)
+        _write_file_atomic(METADATA_FILE, data)
+        logger.info(f"💾 Metadata summary saved to: {METADATA_FILE}")
     except Exception as e:
         logger.error(f"Failed to save metadata summary: {e}")
 
     logger.info("\n🎉 All PDFs ingested into LightRAG successfully!")
     logger.info(f"📊 Total documents processed: {len(pdf_files)}")
     logger.info(f"💾 Data stored in: {WORKING_DIR}")
-    logger.info(f"📋 Metadata summary: {metadata_file}")
+    logger.info(f"📋 Metadata summary: {METADATA_FILE}")
+
+def main():
+    asyncio.run(main_async())
 
 if __name__ == "__main__":
     main()
@@ -1,15 +1,22 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 import os
 import asyncio
+import functools
+import json
 import logging
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Dict, List, Tuple
 
-from rule_engine import compute_score, sanitize_text
-from rag_store import retrieve_recommendations, search_documents, generate_answer, get_document_summary
+from rule_engine import compute_score, prescreen_payload, sanitize_text
+from schemas import BUSINESS_PLAN_CHAR_LIMIT, SearchRequest, GenerateRequest, SearchResponse, GenerateResponse, AssessRequest, AssessResponse
+from openai_http import close_http_client
+from rag_store import retrieve_recommendations, search_documents, generate_answer, stream_answer, get_document_summary_json, get_rag
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -24,12 +31,28 @@ ALLOWED_ORIGINS = [
     "https://frontend-production-1e18.up.railway.app",  # Your specific frontend URL
     "https://msme-scorer-rag-frontend-production.up.railway.app",  # Alternative frontend URL
 ]
-BUSINESS_PLAN_CHAR_LIMIT = 2000
+
+# Clients often resubmit the same business plan while editing a draft
+_sanitize_cached = functools.lru_cache(maxsize=1024)(sanitize_text)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load LightRAG storages before serving traffic so the first request
+    # doesn't pay for it; on failure the stores fall back to lazy init
+    try:
+        await get_rag()
+    except Exception as e:
+        logger.error(f"LightRAG warm-up failed, will retry on first request: {e}")
+    yield
+    # Release the pooled OpenAI connections on shutdown
+    await close_http_client()
 
 app = FastAPI(
     title="MSME Loan Scorer with LightRAG",
     description="A FastAPI backend for MSME loan scoring with LightRAG-powered document search and recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -40,69 +63,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Pydantic models for request/response
-class SearchRequest(BaseModel):
-    query: str
-    top_k: Optional[int] = 5
-    enable_rerank: Optional[bool] = True
-
-class GenerateRequest(BaseModel):
-    query: str
-
-class SearchResult(BaseModel):
-    rank: int
-    content: str
-    score: float
-    metadata: Dict[str, Any] = {}
-    document_metadata: Optional[Dict[str, Any]] = None
-
-class SearchResponse(BaseModel):
-    results: List[SearchResult]
-    total_results: int
-
-class GenerateResponse(BaseModel):
-    answer: str
-
-class AssessRequest(BaseModel):
-    businessName: str
-    industryType: str
-    annualTurnover: float
-    netProfit: float
-    loanAmount: float
-    udyamRegistration: bool
-    businessPlan: str
-
-class AssessResponse(BaseModel):
-    score: float
-    risk_level: str
-    recommendations: List[str]
-    details: Dict[str, Any]
+# Server-sent event routes, which must reach the client chunk by chunk
+STREAMING_PATHS = frozenset(("/api/generate/stream",))
+
+class StreamSafeGZipMiddleware:
+    """
+    GZipMiddleware that passes STREAMING_PATHS through untouched
+
+    Only recent Starlette releases skip text/event-stream responses; older
+    ones would buffer the whole stream before compressing it.
+    """
+
+    def __init__(self, app, **kwargs):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **kwargs)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in STREAMING_PATHS:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+# Search results carry several KB of repetitive JSON each
+app.add_middleware(StreamSafeGZipMiddleware, minimum_size=1024, compresslevel=5)
 
 @app.post("/api/assess", response_model=AssessResponse)
 async def assess(request: AssessRequest):
     """Assess MSME loan application with RAG-powered recommendations"""
-    if len(request.businessPlan) > BUSINESS_PLAN_CHAR_LIMIT:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"businessPlan exceeds {BUSINESS_PLAN_CHAR_LIMIT} characters"
-        )
+    # businessPlan length and non-negative amounts are enforced by AssessRequest
 
     # Sanitize inputs
-    sanitized_name = sanitize_text(request.businessName)
-    sanitized_plan = sanitize_text(request.businessPlan)
-
-    # Compute score
-    payload = {
-        "businessName": sanitized_name,
-        "industryType": request.industryType,
-        "annualTurnover": request.annualTurnover,
-        "netProfit": request.netProfit,
-        "loanAmount": request.loanAmount,
-        "udyamRegistration": request.udyamRegistration,
-        "businessPlan": sanitized_plan
-    }
+    sanitized_name = _sanitize_cached(request.businessName)
+    sanitized_plan = _sanitize_cached(request.businessPlan)
+
+    # Compute score (model_dump runs in pydantic-core)
+    payload = request.model_dump()
+    payload["businessName"] = sanitized_name
+    payload["businessPlan"] = sanitized_plan
     
-    score_result = await compute_score(payload)
+    # Plans that fail the local checks (length, personal information) are
+    # rejected before anything reaches OpenAI; for the rest, scoring and
+    # RAG-powered recommendations (based on business plan and Udyam
+    # registration) are independent, so run them concurrently
+    score_result = prescreen_payload(payload)
+    if score_result is None:
+        score_result, recs = await asyncio.gather(
+            compute_score(payload),
+            retrieve_recommendations(sanitized_plan, top_k=3, udyam_registration=request.udyamRegistration),
+            return_exceptions=True
+        )
+        if isinstance(score_result, BaseException):
+            raise score_result
+        if isinstance(recs, BaseException):
+            logger.error(f"Error retrieving recommendations: {recs}")
+            recs = ["Unable to generate recommendations at this time."]
     
     # Check if there's a validation error in the business plan
     if "error" in score_result:
@@ -117,13 +131,6 @@ async def assess(request: AssessRequest):
             }
         }
     
-    # Get RAG-powered recommendations based on business plan and Udyam registration
-    try:
-        recs = await retrieve_recommendations(sanitized_plan, top_k=3, udyam_registration=request.udyamRegistration)
-    except Exception as e:
-        logger.error(f"Error retrieving recommendations: {e}")
-        recs = ["Unable to generate recommendations at this time."]
-
     # Map the score result to match AssessResponse model
     return {
         "score": score_result["score0to10"],
@@ -143,10 +150,9 @@ async def search_docs(request: SearchRequest):
     
     try:
         results = await search_documents(request.query, top_k=request.top_k, enable_rerank=request.enable_rerank)
-        return SearchResponse(
-            results=results,
-            total_results=len(results)
-        )
+        # FastAPI validates this against response_model itself; building a
+        # SearchResponse here would validate every result twice
+        return {"results": results, "total_results": len(results)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -162,6 +168,24 @@ async def generate_rag_answer(request: GenerateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Generation failed: {str(e)}")
 
+@app.post("/api/generate/stream")
+async def stream_rag_answer(request: GenerateRequest):
+    """Stream an answer as server-sent events while LightRAG generates it"""
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    async def events():
+        try:
+            async for chunk in stream_answer(request.query):
+                # JSON-encode so newlines in the answer can't break SSE framing
+                yield f"data: {json.dumps(chunk)}\n\n"
+        except Exception as e:
+            logger.error(f"Error during streamed generation: {e}")
+            yield f"event: error\ndata: {json.dumps(f'Generation failed: {str(e)}')}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.get("/api/health")
 async def health():
     """Health check endpoint"""
@@ -189,6 +213,7 @@ async def get_info():
             "POST /api/assess - Assess loan application",
             "POST /api/search - Search documents",
             "POST /api/generate - Generate answers",
+            "POST /api/generate/stream - Stream generated answers",
             "GET /api/health - Health check",
             "GET /api/info - Service information",
             "GET /api/documents - Document summary"
@@ -198,16 +223,17 @@ async def get_info():
 @app.get("/api/documents")
 async def get_documents():
     """Get summary of all ingested documents with metadata"""
-    return get_document_summary()
+    # Pre-serialized at startup, so skip FastAPI's encoding pass
+    return Response(content=get_document_summary_json(), media_type="application/json")
 
 @app.post("/api/ingest-pdfs")
 async def ingest_pdfs():
     """One-time endpoint to ingest PDFs into LightRAG"""
     try:
-        # Import the ingestion function
-        from ingest import main as ingest_main
+        # Import the ingestion coroutine
+        from ingest import main_async as ingest_main
         
-        # Run the ingestion
+        # Run the ingestion on the server's event loop
         await ingest_main()
         
         return {
@@ -223,18 +249,28 @@ async def ingest_pdfs():
             "timestamp": datetime.now().isoformat()
         }
 
+PDF_SCAN_TTL_SECONDS = 5.0
+_pdf_scan_cache: Dict[str, Tuple[float, List[str]]] = {}
+
+def _scan_pdfs(directory: str) -> List[str]:
+    """PDF file names in a directory; DirEntry caches the name and file type"""
+    with os.scandir(directory) as entries:
+        return [entry.name for entry in entries if entry.name.lower().endswith('.pdf') and entry.is_file()]
+
 @app.get("/api/check-files")
 async def check_files():
     """Check what PDF files are available in the backend directory"""
-    import os
-    
     backend_dir = os.path.dirname(__file__)
-    pdf_files = []
     
     try:
-        for file in os.listdir(backend_dir):
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(file)
+        # The directory rarely changes at request time, so reuse a recent scan
+        cached = _pdf_scan_cache.get(backend_dir)
+        if cached and time.monotonic() - cached[0] < PDF_SCAN_TTL_SECONDS:
+            pdf_files = cached[1]
+        else:
+            # Directory listing is blocking I/O; keep it off the event loop
+            pdf_files = await asyncio.to_thread(_scan_pdfs, backend_dir)
+            _pdf_scan_cache[backend_dir] = (time.monotonic(), pdf_files)
         
         return {
             "status": "success",
@@ -286,11 +322,17 @@ async def assess_legacy(request: Request):
     if len(payload["businessPlan"]) > BUSINESS_PLAN_CHAR_LIMIT:
         raise HTTPException(status_code=400, detail=f"businessPlan exceeds {BUSINESS_PLAN_CHAR_LIMIT} chars")
 
-    payload["businessName"] = sanitize_text(payload["businessName"])
-    payload["businessPlan"] = sanitize_text(payload["businessPlan"])
+    payload["businessName"] = _sanitize_cached(payload["businessName"])
+    payload["businessPlan"] = _sanitize_cached(payload["businessPlan"])
+
+    score_result = prescreen_payload(payload)
+    if score_result is not None:
+        return {**score_result, "recommendations": [score_result["error"]]}
 
-    score_result = await compute_score(payload)
-    recs = await retrieve_recommendations(payload["businessPlan"], top_k=3)
+    score_result, recs = await asyncio.gather(
+        compute_score(payload),
+        retrieve_recommendations(payload["businessPlan"], top_k=3)
+    )
 
     return {**score_result, "recommendations": recs}
 
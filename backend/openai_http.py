@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP connection pool for OpenAI requests
+LightRAG's OpenAI wrappers build (and close) an AsyncOpenAI client per call;
+handing them one long-lived httpx client keeps TLS connections warm
+"""
+
+import importlib.util
+import logging
+from typing import Any, Dict, Optional
+import httpx
+from openai import DefaultAsyncHttpxClient
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 50
+MAX_KEEPALIVE_CONNECTIONS = 20
+
+class _SharedAsyncClient(DefaultAsyncHttpxClient):
+    """httpx client that outlives the per-call AsyncOpenAI clients using it"""
+
+    async def aclose(self):
+        # AsyncOpenAI.close() closes its http client; keep the shared pool open
+        pass
+
+    async def shutdown(self):
+        await super().aclose()
+
+_http_client: Optional[_SharedAsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled client (HTTP/2 when the h2 package is installed)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = _SharedAsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+    return _http_client
+
+def openai_client_configs() -> Dict[str, Any]:
+    """client_configs for LightRAG's OpenAI wrappers that use the shared pool"""
+    return {"http_client": get_http_client()}
+
+async def close_http_client():
+    """Close the shared pool's connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.shutdown()
+        _http_client = None
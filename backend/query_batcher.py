@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Query Batcher for embedding requests
+Coalesces the query embeddings of concurrent requests into one embedding call
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class QueryBatcher:
+    """
+    Collects texts submitted within a short window and embeds them together
+
+    The first text to arrive opens a batch; anything submitted during the next
+    max_wait seconds (up to max_batch texts) joins it. Each batch is embedded
+    with a single call to embed_func and the vectors are handed back to the
+    individual callers.
+    """
+
+    def __init__(
+        self,
+        embed_func: Callable[[List[str]], Awaitable[np.ndarray]],
+        max_batch: int = 16,
+        max_wait: float = 0.005
+    ):
+        self.embed_func = embed_func
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed one text as part of the next batch"""
+        if self._task is None or self._task.done():
+            # Started lazily so the loop runs on whichever event loop serves requests
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Give concurrent requests a moment to join this batch
+            await asyncio.sleep(self.max_wait)
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            # Dispatch without waiting so the next batch can start collecting
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]):
+        if len(batch) > 1:
+            logger.debug(f"Embedding {len(batch)} queries in one request")
+        try:
+            vectors = await self.embed_func([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
@@ -1,14 +1,27 @@
 import os
 import asyncio
+import copy
 import logging
-import json
-from typing import List, Dict, Any, Optional
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+import numpy as np
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+import orjson
 # Official LightRAG imports
 from lightrag import LightRAG, QueryParam
 from lightrag.llm.openai import gpt_4o_mini_complete, openai_embed
 from lightrag.kg.shared_storage import initialize_pipeline_status
-from lightrag.utils import logger, set_verbose_debug
+from lightrag.utils import EmbeddingFunc, logger, set_verbose_debug
 from rerank_func import simple_rerank_func
+from cached_embed import cached_openai_embed
+from semantic_cache import SemanticCache
+from query_batcher import QueryBatcher
+from openai_http import openai_client_configs
 
 # -------------------------
 # 🔧 Logging
@@ -21,74 +34,205 @@ set_verbose_debug(True)  # Enable verbose logging for debugging
 # -------------------------
 WORKING_DIR = os.path.join(os.path.dirname(__file__), "rag-pdf")
 
+GENERATION_ERROR_PREFIX = "Sorry, I encountered an error while generating the answer"
+# Answers starting with these are refusals rather than content
+REFUSAL_PREFIXES = ("I'm sorry", "I apologize")
+
+# LightRAG chunk IDs are "chunk-" followed by an MD5 hex digest
+CHUNK_ID_RE = re.compile(r"chunk-[0-9a-f]{32}")
+MSME_TERMS = ("msme", "sme", "loan", "policy", "guidelines", "eligibility")
+# Finds every term in one pass; the lookahead lets overlapping terms
+# ("sme" inside "msme") both match
+MSME_TERM_RE = re.compile("(?=(" + "|".join(MSME_TERMS) + "))")
+# Start of a References section in generated answers, after leading whitespace
+REFERENCES_HEADER_RE = re.compile(r"\s*(?:### )?references", re.IGNORECASE)
+# unknown_source citations that LightRAG adds when a chunk has no file path
+UNKNOWN_SOURCE_LINE_RE = re.compile(r"\n\s*\[[^\]]*\]\s*unknown_source\s*\n?", re.IGNORECASE)
+UNKNOWN_SOURCE_SECTION_RE = re.compile(r"\n\s*###\s*References?\s*\n.*unknown_source.*", re.IGNORECASE | re.DOTALL)
+
+# document_metadata attached to search results; shared between results rather
+# than rebuilt for each one
+DEFAULT_DOCUMENT_METADATA = {
+    "document_name": "MSME Policy Document",
+    "document_type": "MSME_POLICY_DOCUMENT",
+    "business_domain": "MSME_LOANS"
+}
+DEFAULT_POLICY_METADATA = {
+    **DEFAULT_DOCUMENT_METADATA,
+    "content_topics": ["loan_eligibility", "application_process", "documentation_requirements"]
+}
+
+def _file_path_metadata(doc_id: str, file_path: str) -> Dict[str, Any]:
+    """document_metadata for a LightRAG document known only by its file path"""
+    return {
+        "document_name": file_path,
+        "document_id": doc_id,
+        "document_type": "MSME_POLICY_DOCUMENT",
+        "business_domain": "MSME_LOANS",
+        "source_file": file_path
+    }
+
+# Metadata fields whose values repeat across every ingested document
+SHARED_STRING_FIELDS = ("document_type", "document_category", "business_domain", "document_purpose", "target_audience")
+SHARED_LIST_FIELDS = ("search_keywords", "content_topics")
+
+def _load_json(path: str) -> Any:
+    """Parse a JSON file"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    return orjson.loads(raw)
+
 class RAGStore:
     def __init__(self):
         self.rag = None
         self._initialized = False
+        self._init_lock = asyncio.Lock()
         self.metadata_cache = {}
-        self._load_metadata_cache()
+        self.chunk_index = {}
+        self.doc_id_to_file_path = {}
+        # Metadata is parsed on first use rather than when the module is
+        # imported; initialize() loads it in a worker thread
+        self._metadata_loaded = False
+        self._metadata_lock = threading.Lock()
+    
+    def _ensure_metadata(self):
+        """Load the metadata caches and everything derived from them, once"""
+        if self._metadata_loaded:
+            return
+        with self._metadata_lock:
+            if self._metadata_loaded:
+                return
+            self._load_metadata_cache()
+            self._build_match_arrays()
+            # Truncated previews used when a search finds nothing, as
+            # (position in metadata_cache, preview, metadata)
+            self._sample_contents = []
+            for i, doc_metadata in enumerate(self.metadata_cache.values()):
+                sample_content = doc_metadata.get("content_summary", "")[:300] + "..."
+                if not sample_content.startswith("I'm sorry"):
+                    self._sample_contents.append((i, sample_content, doc_metadata))
+            # metadata_cache is not modified after loading, so the summary served by
+            # /api/documents is built (and serialized) once
+            self._document_summary = self._build_document_summary()
+            self._document_summary_json = orjson.dumps(self._document_summary)
+            self._metadata_loaded = True
     
     def _load_metadata_cache(self):
         """Load metadata from ingestion summary if available"""
         metadata_file = os.path.join(WORKING_DIR, "ingestion_metadata.json")
         kv_store_file = os.path.join(WORKING_DIR, "kv_store_doc_status.json")
         
-        if os.path.exists(metadata_file):
-            try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata_summary = json.load(f)
-                
-                # Create a lookup cache for document metadata
-                for doc_info in metadata_summary.get("ingestion_session", {}).get("documents_processed", []):
-                    if doc_info.get("status") == "success" and "metadata" in doc_info:
-                        doc_metadata = doc_info["metadata"]
-                        doc_id = doc_metadata.get("document_id", doc_info["filename"])
-                        self.metadata_cache[doc_id] = doc_metadata
-                
-                logger.info(f"📋 Loaded metadata for {len(self.metadata_cache)} documents")
-            except Exception as e:
-                logger.warning(f"Failed to load metadata cache: {e}")
+        try:
+            metadata_summary = _load_json(metadata_file)
+            
+            # Create a lookup cache for document metadata
+            shared_lists = {}
+            for doc_info in metadata_summary.get("ingestion_session", {}).get("documents_processed", []):
+                if doc_info.get("status") == "success" and "metadata" in doc_info:
+                    doc_metadata = doc_info["metadata"]
+                    # Parsing gives every document its own copy of these
+                    # repeated values; share one instance across the cache
+                    for field in SHARED_STRING_FIELDS:
+                        if isinstance(doc_metadata.get(field), str):
+                            doc_metadata[field] = sys.intern(doc_metadata[field])
+                    for field in SHARED_LIST_FIELDS:
+                        if isinstance(doc_metadata.get(field), list):
+                            values = tuple(doc_metadata[field])
+                            doc_metadata[field] = shared_lists.setdefault(values, values)
+                    doc_id = doc_metadata.get("document_id", doc_info["filename"])
+                    self.metadata_cache[doc_id] = doc_metadata
+            
+            logger.info(f"📋 Loaded metadata for {len(self.metadata_cache)} documents")
+        except FileNotFoundError:
+            pass  # nothing ingested yet
+        except Exception as e:
+            logger.warning(f"Failed to load metadata cache: {e}")
         
         # Load KV store document status for chunk-to-document mapping and file paths
-        self.chunk_to_doc_mapping = {}
+        # chunk_index maps chunk ID -> (document ID, file path or None)
+        self.chunk_index = {}
         self.doc_id_to_file_path = {}
-        if os.path.exists(kv_store_file):
-            try:
-                with open(kv_store_file, 'r', encoding='utf-8') as f:
-                    kv_store_data = json.load(f)
-                
-                # Create mapping from chunks to document IDs
-                for doc_id, doc_info in kv_store_data.items():
-                    if "chunks_list" in doc_info:
-                        for chunk_id in doc_info["chunks_list"]:
-                            self.chunk_to_doc_mapping[chunk_id] = doc_id
-                    
-                    # Store the file_path for each document ID
-                    file_path = doc_info.get("file_path", "unknown_source")
-                    if file_path != "unknown_source":
-                        self.doc_id_to_file_path[doc_id] = file_path
+        try:
+            kv_store_data = _load_json(kv_store_file)
+            
+            for doc_id, doc_info in kv_store_data.items():
+                # Store the file_path for each document ID
+                file_path = doc_info.get("file_path", "unknown_source")
+                if file_path != "unknown_source":
+                    self.doc_id_to_file_path[doc_id] = file_path
+                else:
+                    file_path = None
                 
-                logger.info(f"📋 Loaded chunk-to-document mapping for {len(self.chunk_to_doc_mapping)} chunks")
-                logger.info(f"📋 Loaded file paths for {len(self.doc_id_to_file_path)} documents")
-            except Exception as e:
-                logger.warning(f"Failed to load KV store mapping: {e}")
+                # Create mapping from chunks to their document, resolved once here
+                if "chunks_list" in doc_info:
+                    entry = (doc_id, file_path)
+                    for chunk_id in doc_info["chunks_list"]:
+                        self.chunk_index[chunk_id] = entry
+            
+            logger.info(f"📋 Loaded chunk-to-document mapping for {len(self.chunk_index)} chunks")
+            logger.info(f"📋 Loaded file paths for {len(self.doc_id_to_file_path)} documents")
+        except FileNotFoundError:
+            pass  # nothing ingested yet
+        except Exception as e:
+            logger.warning(f"Failed to load KV store mapping: {e}")
     
     async def initialize(self):
         """Initialize LightRAG with OpenAI embedding + GPT-4o-mini"""
         if self._initialized:
             return
-            
-        logger.info("Initializing LightRAG with OpenAI embedding + GPT-4o-mini...")
-        self.rag = LightRAG(
-            working_dir=WORKING_DIR,
-            embedding_func=openai_embed,
-            llm_model_func=gpt_4o_mini_complete,
-            rerank_model_func=simple_rerank_func
+
+        async with self._init_lock:
+            # Concurrent first requests wait here instead of each loading storages
+            if self._initialized:
+                return
+
+            logger.info("Initializing LightRAG with OpenAI embedding + GPT-4o-mini...")
+            self.rag = LightRAG(
+                working_dir=WORKING_DIR,
+                embedding_func=EmbeddingFunc(
+                    embedding_dim=openai_embed.embedding_dim,
+                    max_token_size=openai_embed.max_token_size,
+                    func=_coalesced_embed
+                ),
+                llm_model_func=gpt_4o_mini_complete,
+                llm_model_kwargs={"openai_client_configs": openai_client_configs()},
+                rerank_model_func=simple_rerank_func
+            )
+            # Parse the metadata files while LightRAG loads its storages
+            await asyncio.gather(
+                asyncio.to_thread(self._ensure_metadata),
+                self.rag.initialize_storages()
+            )
+            await initialize_pipeline_status()
+            self._initialized = True
+            logger.info("✅ LightRAG initialized successfully")
+    
+    def _build_match_arrays(self):
+        """Build the lookup tables used to attach document metadata to results"""
+        self._file_metadata = {
+            doc_id: _file_path_metadata(doc_id, file_path)
+            for doc_id, file_path in self.doc_id_to_file_path.items()
+        }
+        self._metadata_by_doc_id = {
+            m["document_id"]: m for m in self.metadata_cache.values() if m.get("document_id")
+        }
+        self._match_metadata = list(self.metadata_cache.values())
+        self._match_names = np.array(
+            [m.get("document_name_lower") or m.get("document_name", "").lower() for m in self._match_metadata],
+            dtype=str
+        )
+        self._match_ids = np.array([doc_id.lower() for doc_id in self.metadata_cache], dtype=str)
+        # _match_terms[i, j] is set when MSME_TERMS[j] appears in document i's name
+        self._match_terms = np.array(
+            [[term in name for term in MSME_TERMS] for name in self._match_names.tolist()],
+            dtype=np.int64
+        ).reshape(len(self._match_metadata), len(MSME_TERMS))
+        # Document used for keyword-only matches: the first policy document,
+        # else the first available document
+        self._default_match = next(
+            (m for m in self._match_metadata if "policy" in m.get("document_type", "").lower()),
+            self._match_metadata[0] if self._match_metadata else None
         )
-        await self.rag.initialize_storages()
-        await initialize_pipeline_status()
-        self._initialized = True
-        logger.info("✅ LightRAG initialized successfully")
     
     def _enhance_result_with_metadata(self, result: Dict[str, Any], result_index: int = 0) -> Dict[str, Any]:
         """Enhance search result with document metadata"""
@@ -97,86 +241,67 @@ class RAGStore:
         # First, try to find document metadata using chunk-to-document mapping
         # Look for chunk IDs in the content or metadata
         chunk_id = None
-        if hasattr(self, 'chunk_to_doc_mapping'):
-            # Try to extract chunk ID from content or result metadata
-            for chunk_id_key in self.chunk_to_doc_mapping.keys():
-                if chunk_id_key in str(result) or chunk_id_key in content:
-                    chunk_id = chunk_id_key
+        chunk_entry = None
+        # Try to extract chunk ID from content or result metadata: one scan
+        # for anything shaped like a chunk ID, then dict lookups, instead
+        # of a substring search per known chunk. Content is scanned as is
+        # rather than through a repr of the whole result.
+        for text in (content, str(result.get("metadata") or "")):
+            for match in CHUNK_ID_RE.finditer(text):
+                chunk_entry = self.chunk_index.get(match.group())
+                if chunk_entry is not None:
+                    chunk_id = match.group()
                     break
+            if chunk_entry is not None:
+                break
         
-        if chunk_id and chunk_id in self.chunk_to_doc_mapping:
-            doc_id = self.chunk_to_doc_mapping[chunk_id]
+        if chunk_entry is not None:
+            doc_id, file_path = chunk_entry
             
             # First, try to get the file path from KV store
-            if hasattr(self, 'doc_id_to_file_path') and doc_id in self.doc_id_to_file_path:
-                file_path = self.doc_id_to_file_path[doc_id]
+            if file_path is not None:
                 # Create metadata using the file path from KV store
-                result["document_metadata"] = {
-                    "document_name": file_path,
-                    "document_id": doc_id,
-                    "document_type": "MSME_POLICY_DOCUMENT",
-                    "business_domain": "MSME_LOANS",
-                    "source_file": file_path
-                }
-                logger.info(f"Found document metadata for chunk {chunk_id}: {file_path}")
+                result["document_metadata"] = self._file_metadata[doc_id]
+                logger.debug("Found document metadata for chunk %s: %s", chunk_id, file_path)
                 return result
             
             # Fallback: Find the corresponding metadata from ingestion cache
-            for metadata in self.metadata_cache.values():
-                if metadata.get("document_id") == doc_id:
-                    result["document_metadata"] = metadata
-                    logger.info(f"Found document metadata for chunk {chunk_id}: {metadata.get('document_name')}")
-                    return result
+            metadata = self._metadata_by_doc_id.get(doc_id)
+            if metadata is not None:
+                result["document_metadata"] = metadata
+                logger.debug("Found document metadata for chunk %s: %s", chunk_id, metadata.get('document_name'))
+                return result
         
         # Fallback: Try to find the best matching document based on content similarity
         best_match = None
         best_score = 0
+        content_lower = content.lower()
         
-        for doc_id, metadata in self.metadata_cache.items():
-            # Check if any part of the document name appears in the content
-            doc_name = metadata.get("document_name", "").lower()
-            doc_id_lower = doc_id.lower()
-            
-            # Simple scoring based on content matching
-            score = 0
-            if doc_name in content.lower():
-                score += 10
-            if doc_id_lower in content.lower():
-                score += 5
-            
-            # Check for common MSME terms that might indicate document relevance
-            msme_terms = ["msme", "sme", "loan", "policy", "guidelines", "eligibility"]
-            for term in msme_terms:
-                if term in content.lower() and term in doc_name:
-                    score += 2
-            
-            if score > best_score:
-                best_score = score
-                best_match = metadata
+        if self._match_metadata:
+            # Simple scoring based on content matching, for all documents at once:
+            # document name in content, document ID in content, and common MSME
+            # terms that appear in both the content and the document name
+            found_terms = set(MSME_TERM_RE.findall(content_lower))
+            content_terms = np.array([term in found_terms for term in MSME_TERMS], dtype=np.int64)
+            scores = (
+                10 * (np.char.find(content_lower, self._match_names) >= 0)
+                + 5 * (np.char.find(content_lower, self._match_ids) >= 0)
+                + 2 * (self._match_terms @ content_terms)
+            )
+            best = int(scores.argmax())
+            best_score = int(scores[best])
+            best_match = self._match_metadata[best]
         
         # Use the best match if found, otherwise use a default
         if best_match and best_score > 0:
             result["document_metadata"] = best_match
         else:
             # Try to assign based on content keywords
-            if any(term in content.lower() for term in ["loan", "eligibility", "policy"]):
-                # Find the first policy document
-                for metadata in self.metadata_cache.values():
-                    if "policy" in metadata.get("document_type", "").lower():
-                        result["document_metadata"] = metadata
-                        break
+            if any(term in content_lower for term in ("loan", "eligibility", "policy")):
+                if self._default_match is not None:
+                    result["document_metadata"] = self._default_match
                 else:
-                    # Fallback to first available document
-                    if self.metadata_cache:
-                        first_doc = next(iter(self.metadata_cache.values()))
-                        result["document_metadata"] = first_doc
-                    else:
-                        result["document_metadata"] = {
-                            "document_name": "MSME Policy Document",
-                            "document_type": "MSME_POLICY_DOCUMENT",
-                            "business_domain": "MSME_LOANS",
-                            "content_topics": ["loan_eligibility", "application_process", "documentation_requirements"]
-                        }
+                    result["document_metadata"] = DEFAULT_POLICY_METADATA
         
         return result
     
@@ -186,13 +311,13 @@ class RAGStore:
             await self.initialize()
         
         try:
-            logger.info(f"Searching for query: '{query}' with top_k={top_k}, rerank={enable_rerank}")
+            logger.info("Searching for query: '%s' with top_k=%s, rerank=%s", query, top_k, enable_rerank)
             
             # Use LightRAG's aquery method with re-ranking
             query_param = QueryParam(mode="hybrid", top_k=top_k, enable_rerank=enable_rerank)
             query_result = await self.rag.aquery(query, param=query_param)
             
-            logger.info(f"Query result type: {type(query_result)}")
+            logger.debug("Query result type: %s", type(query_result))
             
             # Parse the query result to extract relevant content
             formatted_results = []
@@ -200,7 +325,7 @@ class RAGStore:
             # Handle different response formats from LightRAG
             if isinstance(query_result, str):
                 # If it's a string response, create a single result
-                if not query_result.startswith("I'm sorry") and not query_result.startswith("I apologize"):
+                if not query_result.startswith(REFUSAL_PREFIXES):
                     formatted_results.append({
                         "rank": 1,
                         "content": query_result,
@@ -211,7 +336,7 @@ class RAGStore:
                 # If it's a dict, extract relevant fields
                 if "answer" in query_result:
                     answer = query_result["answer"]
-                    if not answer.startswith("I'm sorry") and not answer.startswith("I apologize"):
+                    if not answer.startswith(REFUSAL_PREFIXES):
                         formatted_results.append({
                             "rank": 1,
                             "content": answer,
@@ -220,7 +345,7 @@ class RAGStore:
                         })
                 elif "content" in query_result:
                     content = query_result["content"]
-                    if not content.startswith("I'm sorry") and not content.startswith("I apologize"):
+                    if not content.startswith(REFUSAL_PREFIXES):
                         formatted_results.append({
                             "rank": 1,
                             "content": content,
@@ -231,7 +356,7 @@ class RAGStore:
                 # If it's a list, process each item
                 for i, item in enumerate(query_result):
                     if isinstance(item, str):
-                        if not item.startswith("I'm sorry") and not item.startswith("I apologize"):
+                        if not item.startswith(REFUSAL_PREFIXES):
                             formatted_results.append({
                                 "rank": i + 1,
                                 "content": item,
@@ -240,7 +365,7 @@ class RAGStore:
                             })
                     elif isinstance(item, dict):
                         content = item.get("content", str(item))
-                        if not content.startswith("I'm sorry") and not content.startswith("I apologize"):
+                        if not content.startswith(REFUSAL_PREFIXES):
                             formatted_results.append({
                                 "rank": i + 1,
                                 "content": content,
@@ -259,28 +384,21 @@ class RAGStore:
                     if isinstance(original_item, dict):
                         chunk_id = original_item.get("chunk_id") or original_item.get("id")
                 
-                if chunk_id and hasattr(self, 'chunk_to_doc_mapping') and chunk_id in self.chunk_to_doc_mapping:
-                    doc_id = self.chunk_to_doc_mapping[chunk_id]
+                chunk_entry = self.chunk_index.get(chunk_id) if chunk_id else None
+                if chunk_entry is not None:
+                    doc_id, file_path = chunk_entry
                     
                     # First, try to get the file path from KV store
-                    if hasattr(self, 'doc_id_to_file_path') and doc_id in self.doc_id_to_file_path:
-                        file_path = self.doc_id_to_file_path[doc_id]
-                        result["document_metadata"] = {
-                            "document_name": file_path,
-                            "document_id": doc_id,
-                            "document_type": "MSME_POLICY_DOCUMENT",
-                            "business_domain": "MSME_LOANS",
-                            "source_file": file_path
-                        }
-                        logger.info(f"Direct chunk mapping for result {i + 1}: {file_path}")
+                    if file_path is not None:
+                        result["document_metadata"] = self._file_metadata[doc_id]
+                        logger.debug("Direct chunk mapping for result %d: %s", i + 1, file_path)
                         continue
                     
                     # Fallback: Find the corresponding metadata from ingestion cache
-                    for metadata in self.metadata_cache.values():
-                        if metadata.get("document_id") == doc_id:
-                            result["document_metadata"] = metadata
-                            logger.info(f"Direct chunk mapping for result {i + 1}: {metadata.get('document_name')}")
-                            break
+                    metadata = self._metadata_by_doc_id.get(doc_id)
+                    if metadata is not None:
+                        result["document_metadata"] = metadata
+                        logger.debug("Direct chunk mapping for result %d: %s", i + 1, metadata.get('document_name'))
                 
                 # If no direct mapping found, use the enhanced metadata method
                 if not result.get("document_metadata"):
@@ -289,77 +407,64 @@ class RAGStore:
                 # Ensure we have at least basic document metadata
                 if not result.get("document_metadata", {}).get("document_name"):
                     # Try to assign using file paths from KV store first
-                    if hasattr(self, 'doc_id_to_file_path') and self.doc_id_to_file_path:
-                        doc_ids = list(self.doc_id_to_file_path.keys())
-                        doc_index = i % len(doc_ids)
-                        doc_id = doc_ids[doc_index]
-                        file_path = self.doc_id_to_file_path[doc_id]
-                        result["document_metadata"] = {
-                            "document_name": file_path,
-                            "document_id": doc_id,
-                            "document_type": "MSME_POLICY_DOCUMENT",
-                            "business_domain": "MSME_LOANS",
-                            "source_file": file_path
-                        }
-                        logger.info(f"Assigned document {doc_index + 1} to result {i + 1}: {file_path}")
+                    if self.doc_id_to_file_path:
+                        doc_index = i % len(self.doc_id_to_file_path)
+                        doc_id, file_path = next(islice(self.doc_id_to_file_path.items(), doc_index, None))
+                        result["document_metadata"] = self._file_metadata[doc_id]
+                        logger.debug("Assigned document %d to result %d: %s", doc_index + 1, i + 1, file_path)
                     # Fallback to metadata cache
                     elif self.metadata_cache:
-                        doc_list = list(self.metadata_cache.values())
-                        doc_index = i % len(doc_list)
-                        result["document_metadata"] = doc_list[doc_index]
-                        logger.info(f"Assigned document {doc_index + 1} to result {i + 1}: {doc_list[doc_index].get('document_name')}")
+                        doc_index = i % len(self.metadata_cache)
+                        doc_metadata = next(islice(self.metadata_cache.values(), doc_index, None))
+                        result["document_metadata"] = doc_metadata
+                        logger.debug("Assigned document %d to result %d: %s", doc_index + 1, i + 1, doc_metadata.get('document_name'))
                     else:
-                        result["document_metadata"] = {
-                            "document_name": "MSME Policy Document",
-                            "document_type": "MSME_POLICY_DOCUMENT",
-                            "business_domain": "MSME_LOANS"
-                        }
-                        logger.info(f"Assigned default document to result {i + 1}")
+                        result["document_metadata"] = DEFAULT_DOCUMENT_METADATA
+                        logger.debug("Assigned default document to result %d", i + 1)
                 
                 # Log the final document metadata for debugging
-                doc_name = result.get("document_metadata", {}).get("document_name", "Unknown")
-                logger.info(f"Result {i + 1} assigned to document: {doc_name}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    doc_name = result.get("document_metadata", {}).get("document_name", "Unknown")
+                    logger.debug("Result %d assigned to document: %s", i + 1, doc_name)
             
             # If no results found, provide some sample content from the documents
             if not formatted_results and self.metadata_cache:
                 logger.warning("No search results found, providing sample content")
-                doc_list = list(self.metadata_cache.values())
-                for i, doc_metadata in enumerate(doc_list[:top_k]):
-                    sample_content = doc_metadata.get("content_summary", "")[:300] + "..."
-                    if sample_content and not sample_content.startswith("I'm sorry"):
-                        formatted_results.append({
-                            "rank": i + 1,
-                            "content": sample_content,
-                            "score": 0.8 - (i * 0.1),
-                            "metadata": {},
-                            "document_metadata": doc_metadata
-                        })
+                for i, sample_content, doc_metadata in self._sample_contents:
+                    if i >= top_k:
+                        break
+                    formatted_results.append({
+                        "rank": i + 1,
+                        "content": sample_content,
+                        "score": 0.8 - (i * 0.1),
+                        "metadata": {},
+                        "document_metadata": doc_metadata
+                    })
             
-            logger.info(f"Returning {len(formatted_results)} formatted results")
+            logger.info("Returning %d formatted results", len(formatted_results))
             return formatted_results
             
         except Exception as e:
-            logger.error(f"Error during RAG search: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            # logger.exception formats the traceback only if the record is emitted
+            logger.exception("Error during RAG search: %s", e)
             return []
     
-    async def generate_answer(self, query: str, context: List[str] = None) -> str:
+    async def generate_answer(self, query: str, context: List[str] = None, user_prompt: Optional[str] = None) -> str:
         """Generate an answer using LightRAG's generation capabilities"""
         if not self._initialized:
             await self.initialize()
         
         try:
-            logger.info(f"Generating answer for query: '{query}'")
+            logger.info("Generating answer for query: '%s'", query)
             
             if context:
                 # Use provided context
-                logger.info(f"Using provided context with {len(context)} items")
+                logger.info("Using provided context with %d items", len(context))
                 combined_context = "\n\n".join(context)
             else:
                 # Use LightRAG's aquery method with naive mode for generation
                 logger.info("Using LightRAG aquery for answer generation...")
-                query_param = QueryParam(mode="hybrid")
+                query_param = QueryParam(mode="hybrid", user_prompt=user_prompt)
                 result = await self.rag.aquery(query, param=query_param)
                 
                 if isinstance(result, str):
@@ -376,10 +481,45 @@ class RAGStore:
                     return cleaned_result
             
         except Exception as e:
-            logger.error(f"Error during answer generation: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return f"Sorry, I encountered an error while generating the answer: {str(e)}"
+            logger.exception("Error during answer generation: %s", e)
+            return f"{GENERATION_ERROR_PREFIX}: {str(e)}"
+    
+    async def stream_answer(self, query: str) -> AsyncIterator[str]:
+        """Stream an answer from LightRAG as it is generated"""
+        if not self._initialized:
+            await self.initialize()
+        
+        logger.info("Streaming answer for query: '%s'", query)
+        result = await self.rag.aquery(query, param=QueryParam(mode="hybrid", stream=True))
+        
+        if isinstance(result, str):
+            # Cached answers (and LightRAG builds without streaming) come back whole
+            yield self._clean_generation_response(result)
+            return
+        
+        # Complete lines are passed through as they arrive. Once a References
+        # section starts, the rest is held back and cleaned like a full answer.
+        pending = ""
+        in_references = False
+        async for chunk in result:
+            pending += chunk
+            if in_references or "\n" not in pending:
+                continue
+            
+            complete, _, pending = pending.rpartition("\n")
+            ready = []
+            lines = (complete + "\n").splitlines(keepends=True)
+            for i, line in enumerate(lines):
+                if REFERENCES_HEADER_RE.match(line):
+                    in_references = True
+                    pending = "".join(lines[i:]) + pending
+                    break
+                ready.append(line)
+            if ready:
+                yield "".join(ready)
+        
+        if pending:
+            yield self._clean_generation_response(pending) if in_references else pending
     
     def _clean_generation_response(self, response: str) -> str:
         """Clean up generation response to remove unknown_source references"""
@@ -393,7 +533,7 @@ class RAGStore:
         
         for line in lines:
             # Check if we're entering a References section
-            if line.strip().lower().startswith('### references') or line.strip().lower().startswith('references'):
+            if REFERENCES_HEADER_RE.match(line):
                 skip_references = True
                 continue
             
@@ -416,14 +556,22 @@ class RAGStore:
         cleaned_response = '\n'.join(cleaned_lines).strip()
         
         # Also remove any remaining unknown_source patterns
-        import re
-        cleaned_response = re.sub(r'\n\s*\[[^\]]*\]\s*unknown_source\s*\n?', '', cleaned_response, flags=re.IGNORECASE)
-        cleaned_response = re.sub(r'\n\s*###\s*References?\s*\n.*unknown_source.*', '', cleaned_response, flags=re.IGNORECASE | re.DOTALL)
+        cleaned_response = UNKNOWN_SOURCE_LINE_RE.sub('', cleaned_response)
+        cleaned_response = UNKNOWN_SOURCE_SECTION_RE.sub('', cleaned_response)
         
         return cleaned_response
     
     def get_document_summary(self) -> Dict[str, Any]:
         """Get a summary of all ingested documents"""
+        self._ensure_metadata()
+        return self._document_summary
+
+    def get_document_summary_json(self) -> bytes:
+        """Get the document summary already serialized as JSON"""
+        self._ensure_metadata()
+        return self._document_summary_json
+
+    def _build_document_summary(self) -> Dict[str, Any]:
         if not self.metadata_cache:
             return {"message": "No document metadata available"}
         
@@ -450,12 +598,13 @@ class RAGStore:
 # Global RAG store instance
 rag_store = RAGStore()
 
-async def retrieve_recommendations(query: str, top_k: int = 3, udyam_registration: bool = True) -> List[str]:
-    """Retrieve recommendations based on the query using the new AI prompt format"""
-    try:
-        # Check if Udyam registration is mandatory
-        if not udyam_registration:
-            return ["""Recommendation:
+async def get_rag() -> LightRAG:
+    """Get the shared LightRAG instance, loading its storages on first use"""
+    await rag_store.initialize()
+    return rag_store.rag
+
+# Returned without calling the model when the business has no Udyam registration
+NO_UDYAM_RECOMMENDATION = """Recommendation:
 Loan approval is not possible as Udyam registration is mandatory for MSME loans.
 
 User should:
@@ -466,10 +615,13 @@ Complete the registration process with required business documents
 
 Wait for registration approval and certificate generation
 
-Reapply for loan after obtaining Udyam registration"""]
-        
-        # Create the new AI prompt for cases with Udyam registration
-        ai_prompt = f"""You are an expert MSME loan advisor.
+Reapply for loan after obtaining Udyam registration"""
+
+# Instructions for recommendations, passed as LightRAG's user_prompt so the
+# query is only the business plan. LightRAG places them in the system prompt
+# ahead of the retrieved context, where they are part of the byte-identical
+# prefix that OpenAI's prompt caching can reuse between calls.
+RECOMMENDATION_INSTRUCTIONS = """You are an expert MSME loan advisor.
 Based on the provided business plan text, give a concise and clear recommendation in the following format only:
 
 Recommendation:
@@ -485,17 +637,34 @@ User should:
 
 [Action 4]
 
-Do not provide any explanations, analysis, or additional commentary. Only output the recommendation in the exact bullet format shown above.
-
-Business Plan Text:
-{query}"""
+Do not provide any explanations, analysis, or additional commentary. Only output the recommendation in the exact bullet format shown above."""
 
+async def retrieve_recommendations(query: str, top_k: int = 3, udyam_registration: bool = True) -> List[str]:
+    """Retrieve recommendations based on the query using the new AI prompt format"""
+    try:
+        # Check if Udyam registration is mandatory
+        if not udyam_registration:
+            return [NO_UDYAM_RECOMMENDATION]
+        
         # Use LightRAG to generate the recommendation
         if not rag_store._initialized:
             await rag_store.initialize()
         
-        # Use the generate_answer method with the new prompt
-        recommendation = await rag_store.generate_answer(ai_prompt)
+        # Use the generate_answer method with the recommendation instructions;
+        # only a resubmission of the same business plan reuses an earlier
+        # recommendation, since a similar plan is still a different applicant
+        _check_store_signature()
+        key = query.strip().lower()
+        cached = _recommendation_cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            recommendation = cached[1]
+        else:
+            recommendation = await rag_store.generate_answer(query, user_prompt=RECOMMENDATION_INSTRUCTIONS)
+            if _is_generated_answer(recommendation):
+                _recommendation_cache[key] = (time.monotonic() + QUERY_CACHE_TTL_SECONDS, recommendation)
+                _recommendation_cache.move_to_end(key)
+                if len(_recommendation_cache) > RECOMMENDATION_CACHE_SIZE:
+                    _recommendation_cache.popitem(last=False)
         
         # Return as a single recommendation in the expected format
         return [recommendation] if recommendation else ["Unable to generate recommendation at this time."]
@@ -504,14 +673,108 @@ Business Plan Text:
         logger.error(f"Error retrieving recommendations: {e}")
         return ["Unable to retrieve recommendations at this time."]
 
+# Results reused for repeated or near-identical queries
+# (cosine >= SEMANTIC_CACHE_THRESHOLD) for up to QUERY_CACHE_TTL_SECONDS, and
+# dropped as soon as LightRAG's document store changes
+SEMANTIC_CACHE_THRESHOLD = 0.95
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+# One search cache for every parameter set; entries only match lookups with
+# the same (top_k, enable_rerank)
+_search_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl=QUERY_CACHE_TTL_SECONDS)
+_answer_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl=QUERY_CACHE_TTL_SECONDS)
+# Recommendations are per applicant, so they are only reused for the exact
+# same plan: key -> (expiry, recommendation), oldest first
+RECOMMENDATION_CACHE_SIZE = 512
+_recommendation_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_store_signature = None
+
+# Query embeddings of concurrent requests go to OpenAI as one request; the
+# vectors land in the embedding cache, so LightRAG's own embedding of the same
+# query inside aquery is a cache hit
+_query_batcher = QueryBatcher(cached_openai_embed, max_batch=64)
+
+async def _coalesced_embed(texts: List[str], **kwargs) -> np.ndarray:
+    """LightRAG embedding func: single-text (query-time) calls join the next batch"""
+    if len(texts) == 1 and not kwargs:
+        return (await _query_batcher.embed(texts[0]))[np.newaxis, :]
+    return await cached_openai_embed(texts, **kwargs)
+
+def _check_store_signature():
+    """Clear cached results when kv_store_doc_status.json has changed (re-ingestion)"""
+    global _store_signature
+    try:
+        st = os.stat(os.path.join(WORKING_DIR, "kv_store_doc_status.json"))
+        signature = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        signature = None
+
+    if signature != _store_signature:
+        if _store_signature is not None:
+            logger.info("Document store changed, clearing query caches")
+        for cache in (_search_cache, _answer_cache, _recommendation_cache):
+            cache.clear()
+        _store_signature = signature
+
+def _is_generated_answer(answer: str) -> bool:
+    return bool(answer) and not answer.startswith(GENERATION_ERROR_PREFIX)
+
+async def _similarity_cached(
+    cache: SemanticCache,
+    key: str,
+    text: str,
+    compute: Callable[[], Awaitable[Any]],
+    cacheable: Callable[[Any], bool] = bool,
+    namespace: Hashable = None
+) -> Any:
+    """Return compute()'s result, reusing a cached one for the same or a similar text"""
+    _check_store_signature()
+    key = (namespace, key.strip().lower())
+    cached = cache.get_exact(key)
+    if cached is not None:
+        return cached
+
+    try:
+        embedding = await _query_batcher.embed(text)
+    except Exception as e:
+        logger.warning(f"Query embedding failed, bypassing semantic cache: {e}")
+        return await compute()
+
+    cached = cache.get(embedding, namespace)
+    if cached is not None:
+        return cached
+
+    result = await compute()
+    # Errors come back as empty results or messages, so don't pin them in the cache
+    if cacheable(result):
+        cache.put(key, embedding, result, namespace)
+    return result
+
 async def search_documents(query: str, top_k: int = 5, enable_rerank: bool = True) -> List[Dict[str, Any]]:
     """Search documents and return detailed results with metadata"""
-    return await rag_store.search(query, top_k=top_k, enable_rerank=enable_rerank)
+    results = await _similarity_cached(
+        _search_cache, query, query,
+        lambda: rag_store.search(query, top_k=top_k, enable_rerank=enable_rerank),
+        namespace=(top_k, enable_rerank)
+    )
+    # Callers get their own copy, so editing results cannot alter the cache entry
+    return copy.deepcopy(results)
 
 async def generate_answer(query: str) -> str:
     """Generate a comprehensive answer to the query"""
-    return await rag_store.generate_answer(query)
+    return await _similarity_cached(
+        _answer_cache, query, query,
+        lambda: rag_store.generate_answer(query),
+        cacheable=_is_generated_answer
+    )
+
+def stream_answer(query: str) -> AsyncIterator[str]:
+    """Stream an answer to the query as it is generated"""
+    return rag_store.stream_answer(query)
 
 def get_document_summary() -> Dict[str, Any]:
     """Get a summary of all ingested documents"""
-    return rag_store.get_document_summary()
\ No newline at end of file
+    return rag_store.get_document_summary()
+
+def get_document_summary_json() -> bytes:
+    """Get the document summary as JSON bytes"""
+    return rag_store.get_document_summary_json()
\ No newline at end of file
@@ -8,10 +8,18 @@ import asyncio
 import logging
 from typing import List, Dict, Any
 import numpy as np
-from lightrag.llm.openai import openai_embed
+from cached_embed import cached_openai_embed
 
 logger = logging.getLogger(__name__)
 
+# Texts per embedding request, and embedding requests in flight at once
+EMBED_BATCH_SIZE = 64
+_embed_slots = asyncio.Semaphore(8)
+
+async def _embed_batch(texts: List[str]) -> np.ndarray:
+    async with _embed_slots:
+        return await cached_openai_embed(texts)
+
 async def simple_rerank_func(
     query: str, 
     documents: List[str], 
@@ -54,45 +62,47 @@ async def simple_rerank_func(
         if not valid_documents:
             logger.warning("No valid documents to re-rank")
             return []
-        
-        # Get embeddings for query and documents
-        try:
-            query_embedding = await openai_embed([query])
-            query_vector = query_embedding[0] if isinstance(query_embedding, list) else query_embedding
-        except Exception as e:
-            logger.error(f"Error getting query embedding: {e}")
-            return []
-        
+
+        # A single document has nothing to be ordered against
+        if len(valid_documents) == 1:
+            return [{"content": valid_documents[0], "score": 1.0, "rank": 1}]
+
+        # Embed the query and documents in concurrent requests of up to
+        # EMBED_BATCH_SIZE texts, skipping texts already in the embedding
+        # cache; row 0 is the query
+        texts = [query, *valid_documents]
         try:
-            doc_embeddings = await openai_embed(valid_documents)
+            parts = await asyncio.gather(*(
+                _embed_batch(texts[i:i + EMBED_BATCH_SIZE])
+                for i in range(0, len(texts), EMBED_BATCH_SIZE)
+            ))
+            embeddings = np.concatenate(parts).astype(np.float32, copy=False)
         except Exception as e:
-            logger.error(f"Error getting document embeddings: {e}")
+            logger.error(f"Error getting embeddings: {e}")
             return []
         
-        # Calculate similarity scores
-        results = []
-        for i, doc in enumerate(valid_documents):
-            doc_vector = doc_embeddings[i] if isinstance(doc_embeddings, list) else doc_embeddings[i]
-            
-            # Calculate cosine similarity
-            similarity = cosine_similarity(query_vector, doc_vector)
-            
-            results.append({
-                "content": doc,
-                "score": float(similarity),
-                "rank": i + 1
-            })
-        
-        # Sort by similarity score (descending)
-        results.sort(key=lambda x: x["score"], reverse=True)
+        # Cosine similarity of every document to the query at once; zero
+        # vectors keep a norm of 1 so they score 0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        embeddings /= norms
+        scores = embeddings[1:] @ embeddings[0]
         
-        # Update ranks
-        for i, result in enumerate(results):
-            result["rank"] = i + 1
+        # Highest scores first, ties in input order; with top_n only the
+        # selected documents are sorted
+        order = np.arange(len(valid_documents))
+        if top_n is not None and top_n < len(order):
+            order = np.argpartition(-scores, top_n)[:top_n]
+        order = order[np.lexsort((order, -scores[order]))]
         
-        # Return top_n results if specified
-        if top_n is not None:
-            results = results[:top_n]
+        results = [
+            {
+                "content": valid_documents[i],
+                "score": float(scores[i]),
+                "rank": rank
+            }
+            for rank, i in enumerate(order.tolist(), start=1)
+        ]
         
         logger.info(f"Re-ranking completed. Top result score: {float(results[0]['score']):.3f}")
         return results
@@ -108,19 +118,3 @@ async def simple_rerank_func(
             }
             for i, doc in enumerate(documents[:top_n] if top_n else documents)
         ]
-
-def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
-    """Calculate cosine similarity between two vectors"""
-    try:
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-        
-        similarity = float(dot_product / (norm1 * norm2))
-        return similarity
-    except Exception as e:
-        logger.error(f"Error calculating cosine similarity: {e}")
-        return 0.0
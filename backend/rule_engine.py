@@ -1,114 +1,201 @@
 # rule_engine.py
+import asyncio
+import hashlib
+import logging
+import os
 import re
+from collections import OrderedDict
+from typing import Optional, Tuple
+import orjson
+
+logger = logging.getLogger(__name__)
 
 TAG_RE = re.compile(r"<[^>]+>")
+SCRIPT_STYLE_RE = re.compile(r"(?is)<(script|style).*?>.*?</\1>")
+
+# Personal information that makes a business plan invalid
+PII_RES = (
+    re.compile(r'\b\d{10}\b'),  # 10-digit numbers (phone numbers)
+    re.compile(r'\b\d{12}\b'),  # 12-digit numbers (Aadhaar)
+    re.compile(r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b'),  # Credit card numbers
+    re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),  # Email addresses
+)
+
+# Industries that earn a point, and string answers that count as Udyam registered
+SCORED_INDUSTRIES = frozenset(("manufacturing", "services"))
+YES_ANSWERS = frozenset(("yes", "true", "1"))
+
+# Business-plan validations in flight at once; the rest queue here rather
+# than running into the provider's rate limit. Retries with backoff happen
+# inside LightRAG's openai_complete_if_cache.
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "16"))
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# Instructions for the validation call, sent as the system message so that
+# every request starts with the same bytes (eligible for OpenAI's prompt
+# caching); the plan itself is the user message
+VALIDATION_SYSTEM_PROMPT = """You are a business plan validator for MSME loan applications.
+
+Rate the business plan you are given on a scale of 0-5:
+- 0: Not a business plan (personal content, irrelevant topics, inappropriate content)
+- 1: Very poor business plan (vague, no financial details, unrealistic)
+- 2: Poor business plan (basic idea, minimal planning, lacks details)
+- 3: Acceptable business plan (clear business concept, some financial details, basic planning)
+- 4: Good business plan (detailed planning, financial projections, clear strategy)
+- 5: Excellent business plan (comprehensive, realistic projections, clear strategy, market analysis)
+
+Give a brief explanation of the score as the reason, and set isValid to true if the score is 3 or more."""
+
+# Structured output for the validation call: the model can only return an
+# object of this shape, so only a response cut off at the token limit fails
+# to parse
+VALIDATION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "business_plan_validation",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "score": {"type": "integer"},
+                "reason": {"type": "string"},
+                "isValid": {"type": "boolean"},
+            },
+            "required": ["score", "reason", "isValid"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# AI validations of recently seen plans, keyed by a digest of the plan text
+# (LRU); only parsed model responses are kept, never fallbacks
+VALIDATION_CACHE_SIZE = int(os.getenv("VALIDATION_CACHE_SIZE", "4096"))
+_validation_cache: "OrderedDict[bytes, dict]" = OrderedDict()
+
+def _plan_key(business_plan: str) -> bytes:
+    return hashlib.blake2b(business_plan.strip().encode("utf-8"), digest_size=16).digest()
 
 def sanitize_text(s: str) -> str:
     if not s:
         return ""
-    s = re.sub(r"(?is)<(script|style).*?>.*?</\1>", "", s)
-    s = TAG_RE.sub("", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    # Text without markup only needs its whitespace collapsed
+    if "<" in s:
+        s = SCRIPT_STYLE_RE.sub("", s)
+        s = TAG_RE.sub("", s)
+    return " ".join(s.split())
 
-async def validate_business_plan_with_ai(business_plan: str) -> dict:
-    """Validate business plan using OpenAI AI for intelligent scoring"""
-    import json
-    from lightrag.llm.openai import gpt_4o_mini_complete
-    
+def check_business_plan_locally(business_plan: str) -> Optional[dict]:
+    """Return the failed validation for plans rejected without the AI, else None"""
     # Basic validation for obvious issues
     if not business_plan or len(business_plan.strip()) < 50:
         return {"is_valid": False, "score": 0, "reason": "Business plan is too short (minimum 50 characters required)"}
     
     # Check for PII patterns (keep this for security)
-    pii_patterns = [
-        r'\b\d{10}\b',  # 10-digit numbers (phone numbers)
-        r'\b\d{12}\b',  # 12-digit numbers (Aadhaar)
-        r'\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b',  # Credit card numbers
-        r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',  # Email addresses
-    ]
-    
-    for pattern in pii_patterns:
-        if re.search(pattern, business_plan):
-            return {"is_valid": False, "score": 0, "reason": "Business plan contains personal information (phone numbers, emails, etc.)"}
+    if any(pattern.search(business_plan) for pattern in PII_RES):
+        return {"is_valid": False, "score": 0, "reason": "Business plan contains personal information (phone numbers, emails, etc.)"}
+    return None
+
+async def validate_business_plan_with_ai(business_plan: str) -> dict:
+    """Validate business plan using OpenAI AI for intelligent scoring"""
+    rejection = check_business_plan_locally(business_plan)
+    if rejection is not None:
+        return rejection
     
     # Let AI handle all content validation - no keyword filtering
+    key = _plan_key(business_plan)
+    cached = _validation_cache.get(key)
+    if cached is not None:
+        _validation_cache.move_to_end(key)
+        return dict(cached)
+    
+    # AI-powered validation; imported here so the rejections above
+    # never load the OpenAI client
+    from lightrag.llm.openai import gpt_4o_mini_complete
+    from openai_http import openai_client_configs
     
-    # AI-powered validation
     try:
-        prompt = f"""
-You are a business plan validator for MSME loan applications. 
-
-Rate this business plan on a scale of 0-5:
-- 0: Not a business plan (personal content, irrelevant topics, inappropriate content)
-- 1: Very poor business plan (vague, no financial details, unrealistic)
-- 2: Poor business plan (basic idea, minimal planning, lacks details)
-- 3: Acceptable business plan (clear business concept, some financial details, basic planning)
-- 4: Good business plan (detailed planning, financial projections, clear strategy)
-- 5: Excellent business plan (comprehensive, realistic projections, clear strategy, market analysis)
-
-Business Plan: "{business_plan}"
-
-Respond in JSON format only:
-{{
-    "score": number (0-5),
-    "reason": "brief explanation of the score",
-    "isValid": boolean (true if score >= 3)
-}}
-"""
+        prompt = f'Business Plan: "{business_plan}"'
         
         # Call OpenAI API
-        response = await gpt_4o_mini_complete([prompt])
+        async with _llm_slots:
+            response = await gpt_4o_mini_complete(
+                prompt,
+                system_prompt=VALIDATION_SYSTEM_PROMPT,
+                response_format=VALIDATION_RESPONSE_FORMAT,
+                openai_client_configs=openai_client_configs()
+            )
         
         # Parse the response
-        try:
-            result = json.loads(response)
-            return {
-                "is_valid": result.get("isValid", False),
-                "score": result.get("score", 0),
-                "reason": result.get("reason", "AI validation failed")
-            }
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {"is_valid": True, "score": 3, "reason": "Business plan appears valid"}
-            
+        result = orjson.loads(response)
+        validation = {
+            "is_valid": result.get("isValid", False),
+            "score": result.get("score", 0),
+            "reason": result.get("reason", "AI validation failed")
+        }
     except Exception as e:
-        # Fallback in case of API errors
-        return {"is_valid": True, "score": 3, "reason": f"AI validation unavailable: {str(e)}"}
-
-async def compute_score(payload):
-    breakdown = []
-    score = 0
+        # API errors and truncated responses say nothing about the plan, so
+        # report the plan as unassessed rather than scoring it
+        logger.error(f"AI business plan validation failed: {e}")
+        return {"is_valid": None, "score": None, "reason": "AI validation unavailable"}
+    
+    _validation_cache[key] = validation
+    if len(_validation_cache) > VALIDATION_CACHE_SIZE:
+        _validation_cache.popitem(last=False)
+    return dict(validation)
 
+def _ratios(payload) -> Tuple[float, float]:
+    """Profit margin and loan-to-turnover, as percentages of annual turnover"""
     annual_turnover = float(payload.get("annualTurnover", 0) or 0)
     net_profit = float(payload.get("netProfit", 0) or 0)
     loan_amount = float(payload.get("loanAmount", 0) or 0)
 
     profit_margin_pct = (net_profit / annual_turnover * 100) if annual_turnover > 0 else 0
     loan_to_turnover_pct = (loan_amount / annual_turnover * 100) if annual_turnover > 0 else 0
+    return profit_margin_pct, loan_to_turnover_pct
+
+def _invalid_plan_result(payload, business_plan_validation: dict) -> dict:
+    profit_margin_pct, loan_to_turnover_pct = _ratios(payload)
+    return {
+        "score0to10": 0,
+        "band": "red",
+        "breakdown": [{"reason": "Invalid business plan", "points": 0}],
+        "derived": {
+            "profit_margin_pct": round(profit_margin_pct, 2),
+            "loan_to_turnover_pct": round(loan_to_turnover_pct, 2),
+        },
+        "error": "Sorry, please provide valid business plan",
+        "validation_error": business_plan_validation["reason"],
+        "ai_score": business_plan_validation["score"]
+    }
+
+def prescreen_payload(payload) -> Optional[dict]:
+    """
+    compute_score's result for a plan that fails the local checks, else None
+
+    Lets callers reject short or PII-bearing plans before anything is sent
+    to OpenAI.
+    """
+    rejection = check_business_plan_locally(payload.get("businessPlan", "") or "")
+    return None if rejection is None else _invalid_plan_result(payload, rejection)
+
+async def compute_score(payload):
+    breakdown = []
+    score = 0
+
+    profit_margin_pct, loan_to_turnover_pct = _ratios(payload)
 
     # Validate business plan first using AI
     business_plan = payload.get("businessPlan", "") or ""
     business_plan_validation = await validate_business_plan_with_ai(business_plan)
     
-    if not business_plan_validation["is_valid"]:
-        return {
-            "score0to10": 0,
-            "band": "red",
-            "breakdown": [{"reason": "Invalid business plan", "points": 0}],
-            "derived": {
-                "profit_margin_pct": round(profit_margin_pct, 2),
-                "loan_to_turnover_pct": round(loan_to_turnover_pct, 2),
-            },
-            "error": "Sorry, please provide valid business plan",
-            "validation_error": business_plan_validation["reason"],
-            "ai_score": business_plan_validation["score"]
-        }
+    # is_valid is None when the AI could not assess the plan
+    if business_plan_validation["is_valid"] is False:
+        return _invalid_plan_result(payload, business_plan_validation)
 
     # Udyam registration
     udyam = payload.get("udyamRegistration", False)
     if isinstance(udyam, str):
-        udyam = udyam.strip().lower() in ("yes", "true", "1")
+        udyam = udyam.strip().lower() in YES_ANSWERS
     if udyam:
         score += 2
         breakdown.append({"reason": "Udyam registration", "points": 2})
@@ -137,7 +224,7 @@ async def compute_score(payload):
 
     # Industry points
     industry = (payload.get("industryType") or "").strip().lower()
-    ind_points = 1 if industry in ("manufacturing", "services") else 0
+    ind_points = 1 if industry in SCORED_INDUSTRIES else 0
     score += ind_points
     breakdown.append({"reason": f"Industry ({industry})", "points": ind_points})
 
@@ -146,7 +233,9 @@ async def compute_score(payload):
     plan_points = 0
     
     # Convert AI score (0-5) to points (0-2)
-    if ai_score >= 5:
+    if ai_score is None:
+        breakdown.append({"reason": f"Business plan not assessed ({business_plan_validation['reason']})", "points": 0})
+    elif ai_score >= 5:
         plan_points = 2
         breakdown.append({"reason": f"Excellent business plan (AI score: {ai_score}/5)", "points": 2})
     elif ai_score >= 4:
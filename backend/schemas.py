@@ -0,0 +1,43 @@
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+
+BUSINESS_PLAN_CHAR_LIMIT = 2000
+
+# Pydantic models for request/response
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = Field(5, ge=1, le=50)
+    enable_rerank: Optional[bool] = True
+
+class GenerateRequest(BaseModel):
+    query: str
+
+class SearchResult(BaseModel):
+    rank: int
+    content: str
+    score: float
+    metadata: Dict[str, Any] = {}
+    document_metadata: Optional[Dict[str, Any]] = None
+
+class SearchResponse(BaseModel):
+    results: List[SearchResult]
+    total_results: int
+
+class GenerateResponse(BaseModel):
+    answer: str
+
+class AssessRequest(BaseModel):
+    businessName: str
+    industryType: str
+    # Checked by pydantic-core while parsing, before the handler runs
+    annualTurnover: float = Field(ge=0)
+    netProfit: float
+    loanAmount: float = Field(ge=0)
+    udyamRegistration: bool
+    businessPlan: str = Field(max_length=BUSINESS_PLAN_CHAR_LIMIT)
+
+class AssessResponse(BaseModel):
+    score: float
+    risk_level: str
+    recommendations: List[str]
+    details: Dict[str, Any]
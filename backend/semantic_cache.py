@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Semantic Query Cache for RAG search
+Serves cached results for queries whose embedding is close to a previous query
+"""
+
+import logging
+import time
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Random-hyperplane LSH: each table hashes a vector to LSH_BITS sign bits.
+# A pair at cosine 0.95 lands in the same bucket of one table with p ~= 0.5,
+# so with 4 tables a near-duplicate is a candidate ~95% of the time.
+LSH_TABLES = 4
+LSH_BITS = 6
+LSH_SEED = 0
+# Weights that turn each table's row of sign bits into its bucket number
+_BIT_WEIGHTS = 1 << np.arange(LSH_BITS, dtype=np.int64)
+
+class SemanticCache:
+    """
+    In-memory cache keyed by query text and by query embedding
+
+    Lookups first try an exact match on the query key, then a cosine-similarity
+    check against the cached queries that share an LSH bucket with the query.
+    Entries live in a fixed-size ring buffer, so the oldest entry is
+    overwritten once full. With a ttl, entries also expire after ttl seconds.
+    Entries put under a namespace only match lookups in the same namespace.
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 512, ttl: Optional[float] = None):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._exact: Dict[Hashable, int] = {}  # key -> slot
+        self._embeddings: Optional[np.ndarray] = None  # (maxsize, dim), rows L2-normalized
+        self._planes: Optional[np.ndarray] = None  # (dim, LSH_TABLES * LSH_BITS)
+        self._buckets: List[Dict[Hashable, Set[int]]] = [{} for _ in range(LSH_TABLES)]
+        self._slot_buckets: List[Optional[Tuple[Hashable, ...]]] = [None] * maxsize
+        self._keys: list = [None] * maxsize
+        self._values: list = [None] * maxsize
+        self._expires = np.full(maxsize, np.inf)
+        self._size = 0
+        self._next = 0
+
+    def get_exact(self, key: Hashable) -> Optional[Any]:
+        """Return the value cached for exactly this key, if any"""
+        slot = self._exact.get(key)
+        if slot is None or self._expires[slot] <= time.monotonic():
+            return None
+        return self._values[slot]
+
+    def get(self, embedding: np.ndarray, namespace: Hashable = None) -> Optional[Any]:
+        """Return the value of the most similar cached query above the threshold"""
+        if not self._size:
+            return None
+
+        query = _normalize(embedding)
+        candidates = set()
+        for table, bucket in zip(self._buckets, self._hash(query, namespace)):
+            candidates.update(table.get(bucket, ()))
+        if not candidates:
+            return None
+
+        slots = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+        if self.ttl is not None:
+            slots = slots[self._expires[slots] > time.monotonic()]
+            if not slots.size:
+                return None
+        sims = self._embeddings[slots] @ query
+        best = int(sims.argmax())
+        if sims[best] < self.threshold:
+            return None
+
+        logger.debug(f"Semantic cache hit (cosine={float(sims[best]):.3f})")
+        return self._values[slots[best]]
+
+    def put(self, key: Hashable, embedding: np.ndarray, value: Any, namespace: Hashable = None):
+        """Cache a value under both its exact key and its embedding"""
+        vector = _normalize(embedding)
+        if self._embeddings is None:
+            dim = vector.shape[0]
+            self._embeddings = np.zeros((self.maxsize, dim), dtype=np.float32)
+            rng = np.random.default_rng(LSH_SEED)
+            self._planes = rng.standard_normal((dim, LSH_TABLES * LSH_BITS)).astype(np.float32)
+
+        slot = self._next
+        evicted = self._keys[slot]
+        if evicted is not None and self._exact.get(evicted) == slot:
+            del self._exact[evicted]
+        if self._slot_buckets[slot] is not None:
+            for table, bucket in zip(self._buckets, self._slot_buckets[slot]):
+                table[bucket].discard(slot)
+
+        buckets = self._hash(vector, namespace)
+        for table, bucket in zip(self._buckets, buckets):
+            table.setdefault(bucket, set()).add(slot)
+
+        self._embeddings[slot] = vector
+        self._slot_buckets[slot] = buckets
+        self._keys[slot] = key
+        self._values[slot] = value
+        if self.ttl is not None:
+            self._expires[slot] = time.monotonic() + self.ttl
+        self._exact[key] = slot
+
+        self._next = (slot + 1) % self.maxsize
+        self._size = min(self._size + 1, self.maxsize)
+
+    def clear(self):
+        """Drop all cached entries"""
+        self._exact.clear()
+        self._buckets = [{} for _ in range(LSH_TABLES)]
+        self._slot_buckets = [None] * self.maxsize
+        self._keys = [None] * self.maxsize
+        self._values = [None] * self.maxsize
+        self._expires = np.full(self.maxsize, np.inf)
+        self._size = 0
+        self._next = 0
+
+    def _hash(self, vector: np.ndarray, namespace: Hashable = None) -> Tuple[Hashable, ...]:
+        """LSH bucket of a normalized vector in each table, within its namespace"""
+        bits = (vector @ self._planes > 0).reshape(LSH_TABLES, LSH_BITS)
+        buckets = (bits @ _BIT_WEIGHTS).tolist()
+        if namespace is None:
+            return tuple(buckets)
+        return tuple((namespace, bucket) for bucket in buckets)
+
+def _normalize(embedding: np.ndarray) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -1,3 +1,3 @@
 #!/bin/bash
 echo "Starting MSME Loan Scorer Backend..."
-uvicorn main:app --host 0.0.0.0 --port $PORT
+uvicorn main:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools
@@ -11,5 +11,5 @@ python --version
 
 echo ""
 echo "=== Trying to run uvicorn ==="
-echo "Command: uvicorn main:app --host 0.0.0.0 --port $PORT"
-uvicorn main:app --host 0.0.0.0 --port $PORT
+echo "Command: uvicorn main:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools"
+uvicorn main:app --host 0.0.0.0 --port $PORT --loop uvloop --http httptools
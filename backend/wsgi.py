@@ -20,4 +20,5 @@ if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
     print(f"🚀 Starting server on port {port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # uvloop and httptools come with uvicorn[standard]
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")